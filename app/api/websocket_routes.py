@@ -3,12 +3,19 @@ import contextlib
 import json
 import logging
 import os
-import threading
-from queue import Queue, Empty
-from typing import Optional
+from typing import Final, Optional
 
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from fastapi.responses import HTMLResponse
+
+try:
+    import orjson  # C-accelerated; optional, stdlib json is the fallback.
+except ImportError:
+    orjson = None
+
+try:
+    import audioop  # C-level RMS over int16 PCM; removed in Python 3.13.
+except ImportError:
+    audioop = None
 
 from app.services import speech_to_text
 from app.services.llm_service import LLMService
@@ -20,53 +27,185 @@ logger = logging.getLogger(__name__)
 llm_service_instance: Optional[LLMService] = None
 tts_service_instance: Optional[TTSService] = None
 
+# Sentinel pushed onto responses_q to unblock and terminate the sender task.
+_SHUTDOWN = object()
+
+# Coalesce incoming audio frames to roughly this many bytes (100 ms of
+# 16 kHz mono 16-bit PCM) before handing them to the STT pipeline.
+_AUDIO_BATCH_BYTES = 3200
+_AUDIO_BATCH_SECONDS = 0.1
+
+# Cap on messages coalesced into one outbound frame, so a long backlog never
+# turns into one unbounded write.
+_SEND_BATCH_MAX = 64
+
+# Slots of responses_q that back-pressured audio may never occupy, reserved
+# for control frames (finals, gemini_response, tts_cancelled, shutdown) so a
+# queue full of audio cannot force one of those to be dropped.
+_AUDIO_HEADROOM = 4
+
+# Energy gate for uplink audio: batches whose RMS falls below this (int16
+# scale) count as silence. Silence is still forwarded for a short hangover so
+# Google's endpointing hears the pause that closes the utterance; only
+# sustained silence beyond that is dropped.
+_SILENCE_RMS = 200
+_SILENCE_HANGOVER_BATCHES = 10  # ~1 s of 100 ms batches
+
+# The control protocol is a handful of fixed tiny frames; compare literally
+# instead of running a JSON parser per text message. JSON.stringify's output
+# for the browser client's stop frame is byte-stable.
+_STOP_FRAMES = frozenset({'{"type":"stop"}', "stop", "close", "eos"})
+
+def _is_superseded_interim(item) -> bool:
+    # A non-final transcript is replaced by whatever comes next, so it is the
+    # only message that can be shed without losing information.
+    return (
+        isinstance(item, dict)
+        and item.get("type") == "transcript"
+        and not item.get("is_final")
+    )
+
+if orjson is not None:
+    def _dumps(obj) -> str:
+        return orjson.dumps(obj).decode()
+else:
+    # Bind one compact encoder instead of re-creating encoder state (and the
+    # default ensure_ascii/separator options) inside json.dumps per call.
+    _encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+    def _dumps(obj) -> str:
+        return _encode(obj)
+
+# Env vars do not change in a serving process; check once at import rather
+# than on every WebSocket accept.
+_CREDENTIALS_OK: Final[bool] = bool(os.environ.get("GOOGLE_APPLICATION_CREDENTIALS"))
+
+# Immutable control messages, serialized once at import.
+_READY_MSG = _dumps({"type": "info", "message": "Ready to receive audio (16kHz LINEAR16)."})
+
+# Pre-serialized info messages for anything that failed to come up; populated
+# here for the credentials check and by main.py's startup event for the
+# services, then replayed to each new connection with a single branch.
+_STARTUP_ERRORS: list[str] = []
+
+def register_startup_error(message: str) -> None:
+    logger.error(message)
+    _STARTUP_ERRORS.append(_dumps({"type": "info", "message": message}))
+
+if not _CREDENTIALS_OK:
+    register_startup_error("Server missing GOOGLE_APPLICATION_CREDENTIALS; transcription will not work.")
+
 @router.websocket("/ws")
 async def websocket_endpoint(ws: WebSocket):
     await ws.accept()
     logger.info("WebSocket client connected: %s", ws.client)
 
-    credentials_ok = bool(os.environ.get("GOOGLE_APPLICATION_CREDENTIALS"))
-    if not credentials_ok:
-        msg = "Server missing GOOGLE_APPLICATION_CREDENTIALS; transcription will not work."
-        logger.error(msg)
-        await ws.send_text(json.dumps({"type": "info", "message": msg}))
-    
-    if llm_service_instance is None:
-        msg = "LLMService not initialized. Gemini LLM will not work."
-        logger.error(msg)
-        await ws.send_text(json.dumps({"type": "info", "message": msg}))
-    
-    if tts_service_instance is None:
-        msg = "TTSService not initialized. ElevenLabs TTS will not work."
-        logger.error(msg)
-        await ws.send_text(json.dumps({"type": "info", "message": msg}))
-
-    audio_q: Queue = Queue(maxsize=100)
-    responses_q: asyncio.Queue = asyncio.Queue()
-    stop_event = threading.Event()
-    loop = asyncio.get_running_loop()
+    for startup_error in _STARTUP_ERRORS:
+        await ws.send_text(startup_error)
+
+    audio_q: asyncio.Queue = asyncio.Queue(maxsize=100)
+    responses_q: asyncio.Queue = asyncio.Queue(maxsize=32)
+    stop_event = asyncio.Event()
+
+    def enqueue_response(msg) -> None:
+        # Bounded queue with selective shedding when the client lags: a queued
+        # superseded interim is the preferred victim, falling back to the
+        # oldest other text message. TTS audio bytes are never evicted — a
+        # full queue here is usually full of back-pressured audio, and
+        # dropping a chunk would corrupt the reply mid-playback.
+        if responses_q.full():
+            items = []
+            with contextlib.suppress(asyncio.QueueEmpty):
+                while True:
+                    items.append(responses_q.get_nowait())
+            victim = next((i for i, it in enumerate(items) if _is_superseded_interim(it)), None)
+            if victim is None and not _is_superseded_interim(msg):
+                victim = next(
+                    (i for i, it in enumerate(items)
+                     if not isinstance(it, (bytes, bytearray, memoryview)) and it is not _SHUTDOWN),
+                    None,
+                )
+            if victim is None and msg is _SHUTDOWN and items:
+                victim = 0  # shutting down; one audio chunk no longer matters
+            if victim is not None:
+                del items[victim]
+            for it in items:
+                responses_q.put_nowait(it)
+            if victim is None:
+                # Unreachable by construction: audio stops below the headroom
+                # watermark, so a full queue always holds evictable dicts.
+                # Kept as a guard against future queue writers.
+                if not _is_superseded_interim(msg):
+                    logger.warning(
+                        "Response queue full of audio; dropping a %s message.",
+                        msg.get("type") if isinstance(msg, dict) else type(msg).__name__,
+                    )
+                return
+        responses_q.put_nowait(msg)
+
+    async def enqueue_audio(chunk) -> None:
+        # Audio chunks must not be dropped; wait for queue space so a slow
+        # client paces TTS production instead of growing memory. Audio stops
+        # at a high-water mark short of maxsize so control frames always have
+        # _AUDIO_HEADROOM slots left — a barge-in's tts_cancelled must get
+        # through precisely when the queue is packed with audio.
+        while responses_q.qsize() >= responses_q.maxsize - _AUDIO_HEADROOM:
+            await asyncio.sleep(0.05)
+        responses_q.put_nowait(chunk)
 
-    stt_thread = threading.Thread(
-        target=speech_to_text.stt_worker,
-        name="STT-Thread",
-        args=(audio_q, responses_q, stop_event, credentials_ok, loop, llm_service_instance, tts_service_instance),
-        daemon=True,
+    stt = asyncio.create_task(
+        speech_to_text.stt_task(
+            audio_q,
+            enqueue_response,
+            enqueue_audio,
+            stop_event,
+            _CREDENTIALS_OK,
+            llm_service_instance,
+            tts_service_instance,
+        )
     )
-    stt_thread.start()
-    logger.info("STT worker thread started.")
+    logger.info("STT task started.")
 
     async def sender_task():
+        async def send_one(item) -> None:
+            if item.get("type") == "transcript" and not item.get("is_final"):
+                # Hot path: partial transcripts go out as a compact
+                # "p:<text>" frame the client dispatches without a JSON parse.
+                await ws.send_text("p:" + item["text"])
+            else:
+                await ws.send_text(_dumps(item))
+
+        async def flush_texts(texts) -> None:
+            # A lone message keeps its own framing; a burst is coalesced into
+            # one JSON-array frame (one write syscall) the client iterates.
+            if len(texts) == 1:
+                await send_one(texts[0])
+            elif texts:
+                await ws.send_text(_dumps(texts))
+            texts.clear()
+
         try:
-            while not stop_event.is_set():
-                try:
-                    msg = await asyncio.wait_for(responses_q.get(), timeout=0.2)
-                except asyncio.TimeoutError:
-                    continue
+            stop = False
+            while not stop:
+                batch = [await responses_q.get()]
+                while len(batch) < _SEND_BATCH_MAX:
+                    try:
+                        batch.append(responses_q.get_nowait())
+                    except asyncio.QueueEmpty:
+                        break
+
+                texts = []
                 try:
-                    if msg.get("type") == "audio_chunk" and "data" in msg:
-                        await ws.send_bytes(msg["data"])
-                    else:
-                        await ws.send_text(json.dumps(msg))
+                    for item in batch:
+                        if item is _SHUTDOWN:
+                            stop = True
+                            break
+                        if isinstance(item, (bytes, bytearray, memoryview)):
+                            await flush_texts(texts)
+                            await ws.send_bytes(item)
+                        else:
+                            texts.append(item)
+                    await flush_texts(texts)
                 except Exception as e:
                     logger.exception("Error sending WS message: %s", e)
                     break
@@ -75,52 +214,101 @@ async def websocket_endpoint(ws: WebSocket):
 
     sender = asyncio.create_task(sender_task())
 
+    loop = asyncio.get_running_loop()
+    pending = bytearray()
+    last_flush = loop.time()
+    dropped_batches = 0
+    silent_batches = 0
+
+    async def flush_pending():
+        nonlocal last_flush, dropped_batches, silent_batches
+        if not pending:
+            return
+        batch = bytes(pending)
+        pending.clear()
+        last_flush = loop.time()
+        # Cheap energy gate: skip sustained silence (long pauses, muted mics)
+        # so it never costs uplink bandwidth or Google API time, but let the
+        # first ~1 s of any pause through for endpointing.
+        if audioop is not None:
+            if audioop.rms(batch, 2) < _SILENCE_RMS:
+                silent_batches += 1
+                if silent_batches > _SILENCE_HANGOVER_BATCHES:
+                    return
+            else:
+                silent_batches = 0
+        # Under overflow, shed the *oldest* queued batch rather than this one:
+        # streaming ASR degrades far less when stale audio is dropped than
+        # when the current utterance is fragmented. Drops are counted, not
+        # logged per event, to keep the hot path quiet.
+        if audio_q.full():
+            with contextlib.suppress(asyncio.QueueEmpty):
+                audio_q.get_nowait()
+            dropped_batches += 1
+        audio_q.put_nowait(batch)
+
     try:
-        await ws.send_text(json.dumps({"type": "info", "message": "Ready to receive audio (16kHz LINEAR16)."}))
+        await ws.send_text(_READY_MSG)
 
+        # Hottest loop in the file: dispatch on the payload keys directly
+        # (binary audio first) instead of comparing the ASGI type string per
+        # frame; a message with neither payload is the disconnect event.
+        receive = ws.receive
         while True:
             try:
-                data = await ws.receive()
+                data = await receive()
             except WebSocketDisconnect:
                 logger.info("WebSocket disconnected by client.")
                 break
 
-            msg_type = data.get("type")
-            if msg_type == "websocket.disconnect":
-                logger.info("WebSocket disconnect event.")
-                break
+            chunk = data.get("bytes")
+            if chunk is not None:
+                pending.extend(chunk)
+                if len(pending) >= _AUDIO_BATCH_BYTES or loop.time() - last_flush > _AUDIO_BATCH_SECONDS:
+                    await flush_pending()
+                continue
 
-            if msg_type == "websocket.receive":
-                if "bytes" in data and data["bytes"] is not None:
-                    chunk: bytes = data["bytes"]
-                    logger.debug("Received audio chunk: %d bytes", len(chunk))
-                    try:
-                        audio_q.put_nowait(chunk)
-                    except Exception:
-                        logger.warning("Audio queue full; dropping a chunk of %d bytes", len(chunk))
-                elif "text" in data and data["text"] is not None:
-                    text = data["text"]
-                    logger.info("Received WS text message: %s", text)
-                    if text.strip().lower() in {"stop", "close", "eos"}:
-                        break
-                    await ws.send_text(json.dumps({"type": "info", "message": f"Server received text: {text}"}))
-            else:
-                logger.debug("Unhandled WS event: %s", msg_type)
+            text = data.get("text")
+            if text is not None:
+                logger.info("Received WS text message: %s", text)
+                if text in _STOP_FRAMES or text.strip().lower() in _STOP_FRAMES:
+                    break
+                await ws.send_text(_dumps({"type": "info", "message": f"Server received text: {text}"}))
+                continue
+
+            logger.info("WebSocket disconnect event.")
+            break
 
     except Exception as e:
         logger.exception("WebSocket handler error: %s", e)
     finally:
         with contextlib.suppress(Exception):
+            await flush_pending()
+
+        if dropped_batches:
+            logger.warning("Dropped %d stale audio batches under backpressure this session.", dropped_batches)
+
+        # Exactly one end-of-stream sentinel, and it must land: evict the
+        # oldest queued batch if the queue is full so the request generator is
+        # guaranteed to see the None and close the gRPC stream.
+        with contextlib.suppress(Exception):
+            if audio_q.full():
+                audio_q.get_nowait()
             audio_q.put_nowait(None)
 
         stop_event.set()
 
         with contextlib.suppress(Exception):
-            stt_thread.join(timeout=2.0)
+            enqueue_response(_SHUTDOWN)
 
-        with contextlib.suppress(Exception):
-            sender.cancel()
-            await sender
+        # Tear both tasks down in parallel with one short deadline instead of
+        # waiting on each in turn; cancel whatever has not finished by then.
+        _, unfinished = await asyncio.wait({stt, sender}, timeout=0.5)
+        for task in unfinished:
+            task.cancel()
+        if unfinished:
+            with contextlib.suppress(Exception):
+                await asyncio.wait(unfinished, timeout=0.1)
 
         with contextlib.suppress(Exception):
             await ws.close()
@@ -1,11 +1,16 @@
 import asyncio
+import hashlib
 import os
 import logging
+from collections import OrderedDict
 import google.generativeai as genai
 from typing import Optional, AsyncGenerator
 
 logger = logging.getLogger(__name__)
 
+# Upper bound on cached prompt/response pairs per service instance.
+_RESPONSE_CACHE_MAX = 1024
+
 class LLMService:
     """
     A service class to encapsulate interactions with the Gemini Large Language Model.
@@ -33,12 +38,34 @@ class LLMService:
             genai.configure(api_key=api_key)
             self.model = genai.GenerativeModel(model_name)
             self.tts_service = tts_service # Store the TTS service instance
-            logger.info(f"LLMService initialized with model: {model_name}")
+            # LRU cache of prompt-hash -> response text. Repeated phrasings
+            # skip the Gemini round-trip (and its token cost) entirely.
+            self._response_cache: OrderedDict[str, str] = OrderedDict()
+            logger.info("LLMService initialized with model: %s", model_name)
         except Exception as e:
-            logger.error(f"Failed to initialize Gemini model '{model_name}': {e}", exc_info=True)
+            logger.error("Failed to initialize Gemini model '%s': %s", model_name, e, exc_info=True)
             self.model = None
             raise RuntimeError(f"Could not initialize Gemini model: {e}")
 
+    def _cache_key(self, prompt: str) -> str:
+        # Normalize before hashing — casing, surrounding whitespace, and
+        # terminal punctuation — so trivial variants of common commands
+        # ("Stop.", "stop", " STOP ") share one entry; the prompt itself is
+        # sent to Gemini unmodified.
+        return hashlib.sha256(prompt.strip().lower().rstrip(" .!?").encode()).hexdigest()
+
+    def _cache_get(self, cache_key: str) -> Optional[str]:
+        cached = self._response_cache.get(cache_key)
+        if cached is not None:
+            self._response_cache.move_to_end(cache_key)
+            logger.debug("LLM cache hit for prompt hash %s", cache_key[:12])
+        return cached
+
+    def _cache_put(self, cache_key: str, text: str) -> None:
+        self._response_cache[cache_key] = text
+        if len(self._response_cache) > _RESPONSE_CACHE_MAX:
+            self._response_cache.popitem(last=False)
+
     async def generate_response(self, prompt: str) -> Optional[str]:
         """
         Generates a text response from the Gemini model based on the given prompt.
@@ -52,30 +79,66 @@ class LLMService:
         if self.model is None:
             logger.warning("LLMService model not initialized. Cannot generate response.")
             return None
-        
+
+        cache_key = self._cache_key(prompt)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return cached
+
         try:
-            response = self.model.generate_content(prompt) 
+            # generate_content blocks on the Gemini HTTP round-trip; run it in
+            # a worker thread so the event loop (STT responses, TTS delivery)
+            # keeps moving while we wait.
+            response = await asyncio.to_thread(self.model.generate_content, prompt)
             if hasattr(response, 'text'):
-                logger.debug(f"Gemini raw response: {response}")
+                logger.debug("Gemini raw response: %s", response)
+                self._cache_put(cache_key, response.text)
                 return response.text
             else:
-                logger.warning(f"Gemini response did not contain text. Blocked reason: {response.prompt_feedback.block_reason if response.prompt_feedback else 'N/A'}")
+                logger.warning("Gemini response did not contain text. Blocked reason: %s", response.prompt_feedback.block_reason if response.prompt_feedback else "N/A")
                 return "I'm sorry, I couldn't generate a response for that."
         except Exception as e:
-            logger.error(f"Error generating content from Gemini: {e}", exc_info=True)
+            logger.error("Error generating content from Gemini: %s", e, exc_info=True)
             return f"An error occurred while getting AI response: {e}"
 
-    async def stream_tts_response(self, prompt: str) -> AsyncGenerator[bytes, None]:
+    async def stream_response(self, prompt: str) -> AsyncGenerator[str, None]:
         """
-        Generates an LLM response and then streams the audio of that response
-        using the TTS service.
+        Streams text chunks from the Gemini model as they are decoded.
+
+        Args:
+            prompt (str): The input text prompt for the LLM.
+
+        Yields:
+            str: Incremental pieces of the generated response.
         """
-        # First, generate the text response from the LLM
-        llm_text = await self.generate_response(prompt)
-        
-        if llm_text:
-            # Then, stream the audio of that text using the TTS service
-            for chunk in self.tts_service.stream_audio(llm_text):
-                yield chunk
-        else:
-            yield b"" # Yield an empty chunk if no LLM response
\ No newline at end of file
+        if self.model is None:
+            logger.warning("LLMService model not initialized. Cannot stream response.")
+            return
+
+        # The cache serves the streaming path too — this is the path every
+        # turn takes when TTS is configured, so repeat commands must skip the
+        # Gemini round-trip here, not just in generate_response.
+        cache_key = self._cache_key(prompt)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+
+        loop = asyncio.get_running_loop()
+        pieces = []
+        try:
+            response = await asyncio.to_thread(self.model.generate_content, prompt, stream=True)
+            chunks = iter(response)
+            while True:
+                chunk = await loop.run_in_executor(None, next, chunks, None)
+                if chunk is None:
+                    break
+                if getattr(chunk, "text", None):
+                    pieces.append(chunk.text)
+                    yield chunk.text
+            # Cache only complete responses; a cancelled stream (barge-in)
+            # raises CancelledError past this and caches nothing.
+            if pieces:
+                self._cache_put(cache_key, "".join(pieces))
+        except Exception as e:
+            logger.error("Error streaming content from Gemini: %s", e, exc_info=True)
\ No newline at end of file
@@ -1,11 +1,12 @@
 import asyncio
-import contextlib
-import inspect
 import logging
-import threading
-from queue import Queue, Empty
-from typing import Optional
+import os
+import re
+import time
+from typing import AsyncGenerator, Optional
 
+from google.api_core import exceptions as core_exceptions
+from google.api_core.client_options import ClientOptions
 from google.cloud import speech
 
 from app.services.llm_service import LLMService
@@ -13,6 +14,35 @@ from app.services.text_to_speech import TTSService
 
 logger = logging.getLogger(__name__)
 
+# Coalesce queued audio into gRPC messages of roughly this size (100 ms of
+# 16 kHz mono 16-bit PCM) before handing them to the recognizer.
+_GRPC_BATCH_BYTES = 3200
+
+# Minimum gap between interim transcripts forwarded to the client; Google can
+# emit interims every ~100 ms per active phrase and each forwarded one costs a
+# serialize + WS frame. Finals are never throttled.
+_INTERIM_MIN_INTERVAL = 0.2
+
+# Optional regional endpoint, e.g. "us-central1-speech.googleapis.com" or
+# "eu-speech.googleapis.com". Pinning the region closest to the deployment
+# shaves cross-continent RTT off every recognition round-trip; unset means the
+# global endpoint.
+_SPEECH_ENDPOINT = os.environ.get("SPEECH_API_ENDPOINT")
+
+# One SpeechAsyncClient for the whole process: client construction pays TLS
+# handshake plus ADC credential discovery, and gRPC happily multiplexes
+# concurrent streams over a single channel — the per-utterance stream reopens
+# ride the same warm HTTP/2 connection instead of re-handshaking.
+_shared_client: Optional[speech.SpeechAsyncClient] = None
+
+def _get_shared_client() -> speech.SpeechAsyncClient:
+    global _shared_client
+    if _shared_client is None:
+        _shared_client = speech.SpeechAsyncClient(
+            client_options=ClientOptions(api_endpoint=_SPEECH_ENDPOINT) if _SPEECH_ENDPOINT else None,
+        )
+    return _shared_client
+
 def build_streaming_config() -> speech.StreamingRecognitionConfig:
     rec_config = speech.RecognitionConfig(
         encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
@@ -20,118 +50,325 @@ def build_streaming_config() -> speech.StreamingRecognitionConfig:
         language_code="en-US",
         enable_automatic_punctuation=True,
     )
+    # single_utterance lets Google's server-side VAD close the stream as soon
+    # as the speaker trails off, so the final arrives promptly instead of
+    # waiting for the client to stop; stt_task reopens a fresh stream per
+    # utterance (which also sidesteps the 305 s per-stream limit).
     streaming_config = speech.StreamingRecognitionConfig(
         config=rec_config,
         interim_results=True,
-        single_utterance=False,
+        single_utterance=True,
     )
     return streaming_config
 
-def audio_requests_only_generator(q: Queue):
+# The recognition config never varies per connection; build the protobufs once
+# at import and reuse them (immutable once constructed, safe to share).
+STREAMING_CONFIG = build_streaming_config()
+_FIRST_REQUEST = speech.StreamingRecognizeRequest(streaming_config=STREAMING_CONFIG)
+
+# Stream terminations the per-utterance reconnect loop recovers from by
+# opening a fresh stream: the ~10 s no-audio timeout and 305 s stream cap
+# surface as OutOfRange, the rest are transient server/channel conditions.
+_RETRIABLE_STREAM_ERRORS = (
+    core_exceptions.OutOfRange,
+    core_exceptions.DeadlineExceeded,
+    core_exceptions.ServiceUnavailable,
+    core_exceptions.Aborted,
+    core_exceptions.InternalServerError,
+)
+
+async def streaming_requests(
+    audio_q: asyncio.Queue,
+    stop_event: asyncio.Event,
+    first_chunk: bytes,
+    generation: int,
+    current_generation: list,
+) -> AsyncGenerator[speech.StreamingRecognizeRequest, None]:
+    """
+    Async request feed for the recognizer: the config request first, then
+    first_chunk (dequeued by stt_task before it opened the stream) and
+    coalesced audio. Runs entirely on the event loop — no bridge thread.
+    Seeing the None sentinel sets stop_event so the per-utterance reconnect
+    loop in stt_task knows the session (not just this stream) is over.
+
+    generation/current_generation retire stale generators: grpc.aio does not
+    cancel its request-consumer task when the RPC completes, so a finished
+    stream's generator can wake up in audio_q.get() holding the next
+    utterance's first chunk (or the session sentinel). When stt_task has
+    since bumped current_generation, the item is handed back to the queue
+    instead of being swallowed by the dead RPC.
+    """
+    yield _FIRST_REQUEST
+    chunk = first_chunk
     while True:
-        try:
-            chunk = q.get(timeout=0.1)
-        except Empty:
-            continue
+        if generation != current_generation[0]:
+            audio_q.put_nowait(chunk)
+            return
         if chunk is None:
-            break
-        yield speech.StreamingRecognizeRequest(audio_content=chunk)
-
-def full_requests_generator(q: Queue, streaming_config: speech.StreamingRecognitionConfig):
-    yield speech.StreamingRecognizeRequest(streaming_config=streaming_config)
-    for req in audio_requests_only_generator(q):
-        yield req
-
-def stt_worker(
-    audio_q: Queue,
-    resp_async_q: asyncio.Queue,
-    stop_event: threading.Event,
+            stop_event.set()
+            return
+        # Common case: the receive loop already batched ~100 ms and nothing
+        # else is queued — hand the bytes straight to protobuf (its one
+        # unavoidable copy) with no bytearray round-trip.
+        if audio_q.empty() or len(chunk) >= _GRPC_BATCH_BYTES:
+            yield speech.StreamingRecognizeRequest(audio_content=chunk)
+        else:
+            buf = bytearray(chunk)
+            closing = False
+            while len(buf) < _GRPC_BATCH_BYTES:
+                # Fold in anything already queued behind this chunk so one
+                # gRPC message carries ~100 ms of audio instead of one tiny
+                # frame.
+                try:
+                    part = audio_q.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                if part is None:
+                    closing = True
+                    break
+                buf.extend(part)
+            yield speech.StreamingRecognizeRequest(audio_content=bytes(buf))
+            if closing:
+                stop_event.set()
+                return
+        chunk = await audio_q.get()
+
+# Sentence terminator in streamed LLM text; complete sentences are handed to
+# TTS while the model is still decoding.
+_SENTENCE_END = re.compile(r"[.!?\n]")
+
+def _close_audio_iter(audio_iter) -> None:
+    """
+    Close an abandoned ElevenLabs generator from a worker thread, winding down
+    its HTTP stream. The cancelled next() may still be executing in another
+    executor thread, in which case close() raises ValueError; retry briefly
+    and otherwise leave the generator to the GC.
+    """
+    for _ in range(50):
+        try:
+            audio_iter.close()
+            return
+        except ValueError:
+            time.sleep(0.1)
+
+async def _stream_llm_turn(transcript, llm_service, tts_service, enqueue_audio) -> str:
+    """
+    Overlap Gemini decoding with ElevenLabs synthesis: a producer task cuts
+    the streamed LLM response into sentences while a consumer synthesizes each
+    one, so audio for the first sentence plays while later ones decode.
+    Returns the full response text.
+    """
+    loop = asyncio.get_running_loop()
+    text_q: asyncio.Queue = asyncio.Queue()
+    pieces: list = []
+
+    async def llm_streamer():
+        pending = ""
+        async for piece in llm_service.stream_response(transcript):
+            pieces.append(piece)
+            pending += piece
+            while True:
+                match = _SENTENCE_END.search(pending)
+                if match is None:
+                    break
+                sentence, pending = pending[:match.end()], pending[match.end():]
+                if sentence.strip():
+                    await text_q.put(sentence)
+        if pending.strip():
+            await text_q.put(pending)
+        await text_q.put(None)
+
+    async def tts_pump():
+        logger.info("Streaming audio from ElevenLabs...")
+        audio_iter = None
+        try:
+            while True:
+                sentence = await text_q.get()
+                if sentence is None:
+                    break
+                audio_iter = tts_service.stream_audio(sentence)
+                while True:
+                    chunk = await loop.run_in_executor(None, next, audio_iter, None)
+                    if chunk is None:
+                        audio_iter = None
+                        break
+                    await enqueue_audio(chunk)
+        except asyncio.CancelledError:
+            if audio_iter is not None:
+                # Barge-in: close the abandoned ElevenLabs stream off-loop so
+                # its HTTP connection and executor thread wind down instead of
+                # synthesizing the rest of a reply nobody will hear.
+                loop.run_in_executor(None, _close_audio_iter, audio_iter)
+            raise
+
+    await asyncio.gather(llm_streamer(), tts_pump())
+    return "".join(pieces)
+
+async def stt_task(
+    audio_q: asyncio.Queue,
+    enqueue_response,
+    enqueue_audio,
+    stop_event: asyncio.Event,
     credentials_ok: bool,
-    loop: asyncio.AbstractEventLoop,
     llm_service_instance: Optional[LLMService] = None,
     tts_service_instance: Optional[TTSService] = None,
 ):
-    thread_logger = logging.getLogger(threading.current_thread().name)
+    """
+    Asyncio-native STT pipeline: audio chunks arrive on audio_q; transcripts
+    and LLM replies go out through the enqueue_response callable (bounded,
+    drop-oldest) while TTS audio goes through the awaitable enqueue_audio
+    (bounded, back-pressuring). Recognition uses SpeechAsyncClient, so the
+    request feed and response iteration both live on the event loop; the only
+    blocking piece left (the ElevenLabs audio iterator) runs through the
+    shared default executor.
+    """
     try:
         if not credentials_ok:
             raise RuntimeError(
                 "GOOGLE_APPLICATION_CREDENTIALS not set; cannot initialize SpeechClient."
             )
 
-        client = speech.SpeechClient()
-        streaming_config = build_streaming_config()
+        client = _get_shared_client()
 
-        sig = inspect.signature(client.streaming_recognize)
-        has_config_param = "config" in sig.parameters
-        if has_config_param:
-            thread_logger.info("Using OLD streaming_recognize signature: streaming_recognize(config=..., requests=...)")
-            requests_iter = audio_requests_only_generator(audio_q)
-        else:
-            thread_logger.info("Using NEW streaming_recognize signature: streaming_recognize(requests=...) with initial config request")
-            requests_iter = full_requests_generator(audio_q, streaming_config)
+        current_turn: Optional[asyncio.Task] = None
+        loop = asyncio.get_running_loop()
+        last_interim_text = ""
+        last_interim_ts = 0.0
 
-        thread_logger.info("Starting Google streaming_recognize...")
-        if has_config_param:
-            responses = client.streaming_recognize(config=streaming_config, requests=requests_iter)
-        else:
-            responses = client.streaming_recognize(requests=requests_iter)
+        async def run_turn(turn_transcript: str):
+            try:
+                if tts_service_instance:
+                    llm_text = await _stream_llm_turn(
+                        turn_transcript, llm_service_instance, tts_service_instance, enqueue_audio
+                    )
+                else:
+                    llm_text = await llm_service_instance.generate_response(turn_transcript)
 
-        for response in responses:
-            thread_logger.debug("Raw STT response: %s", response)
-            if not response.results:
-                continue
+                if llm_text:
+                    logger.info("LLM Response: %s", llm_text)
+                    enqueue_response({"type": "gemini_response", "text": llm_text})
+                else:
+                    enqueue_response(
+                        {"type": "info", "message": "Gemini could not generate a response."}
+                    )
+            except asyncio.CancelledError:
+                logger.info("LLM/TTS turn cancelled by barge-in.")
+                # Tell the client to discard audio already buffered for this
+                # turn; a truncated MP3 would otherwise pollute (or break)
+                # the next reply's playback blob.
+                enqueue_response({"type": "tts_cancelled"})
+                raise
+            except Exception as llm_e:
+                logger.exception("Error calling LLMService or TTSService: %s", llm_e)
+                try:
+                    enqueue_response({"type": "info", "message": f"LLM/TTS error: {llm_e}"})
+                except Exception:
+                    logger.warning("Could not report LLM/TTS error to client.")
 
-            for result in response.results:
-                if not result.alternatives:
-                    continue
-                transcript = result.alternatives[0].transcript
-                is_final = bool(result.is_final)
+        # One gRPC stream per utterance: with single_utterance Google closes
+        # the stream shortly after end-of-speech, so reopen until the session
+        # sentinel (which sets stop_event) arrives. An in-flight LLM/TTS turn
+        # survives the reopen; only session teardown cancels it.
+        # stream_generation retires each stream's request generator when its
+        # stream is done (see streaming_requests); a single-element list so
+        # the generators observe the bump.
+        stream_generation = [0]
+        while not stop_event.is_set():
+            # Hold off opening a stream until audio is actually pending:
+            # while the silence gate mutes a long pause, an idle stream
+            # would hit Google's ~10 s no-audio OutOfRange timeout.
+            first_chunk = await audio_q.get()
+            if first_chunk is None:
+                stop_event.set()
+                break
 
-                thread_logger.info("STT Transcript (%s): %s", "final" if is_final else "partial", transcript)
-
-                loop.call_soon_threadsafe(
-                    resp_async_q.put_nowait,
-                    {"type": "transcript", "text": transcript, "is_final": is_final},
+            logger.info("Starting Google streaming_recognize...")
+            responses = await client.streaming_recognize(
+                requests=streaming_requests(
+                    audio_q, stop_event, first_chunk,
+                    stream_generation[0], stream_generation,
                 )
-                
-                if is_final and llm_service_instance:
-                    thread_logger.info("Calling LLMService with final transcript: '%s'", transcript)
-                    try:
-                        llm_text = asyncio.run(llm_service_instance.generate_response(transcript))
-                        
-                        if llm_text:
-                            thread_logger.info("LLM Response: %s", llm_text)
-                            
-                            if tts_service_instance:
-                                thread_logger.info("Streaming audio from ElevenLabs...")
-                                for chunk in tts_service_instance.stream_audio(llm_text):
-                                    loop.call_soon_threadsafe(
-                                        resp_async_q.put_nowait,
-                                        {"type": "audio_chunk", "data": chunk},
-                                    )
-                            loop.call_soon_threadsafe(
-                                resp_async_q.put_nowait,
-                                {"type": "gemini_response", "text": llm_text},
+            )
+
+            try:
+                async for response in responses:
+                    # Rendering the protobuf repr is costly; skip the call
+                    # entirely unless DEBUG is actually enabled.
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("Raw STT response: %r", response)
+                    if not response.results:
+                        continue
+
+                    for result in response.results:
+                        if not result.alternatives:
+                            continue
+                        transcript = result.alternatives[0].transcript
+                        is_final = bool(result.is_final)
+
+                        # Partials arrive many times per second; only finals
+                        # are worth INFO-level noise (and the logging lock
+                        # that comes with it).
+                        if is_final:
+                            logger.info("STT Transcript (final): %s", transcript)
+                        elif logger.isEnabledFor(logging.DEBUG):
+                            logger.debug("STT Transcript (partial): %s", transcript)
+
+                        if is_final:
+                            enqueue_response(
+                                {"type": "transcript", "text": transcript, "is_final": True}
                             )
+                            last_interim_text = ""
                         else:
-                             loop.call_soon_threadsafe(
-                                resp_async_q.put_nowait, {"type": "info", "message": "Gemini could not generate a response."}
-                             )
-
-                    except Exception as llm_e:
-                        thread_logger.exception("Error calling LLMService or TTSService: %s", llm_e)
-                        with contextlib.suppress(Exception):
-                            loop.call_soon_threadsafe(
-                                resp_async_q.put_nowait, {"type": "info", "message": f"LLM/TTS error: {llm_e}"}
-                            )
+                            # Throttle interims: forward only when the text
+                            # actually changed and at most one every
+                            # _INTERIM_MIN_INTERVAL; the next interim (or the
+                            # final) supersedes what's skipped.
+                            now = loop.time()
+                            if transcript != last_interim_text and now - last_interim_ts >= _INTERIM_MIN_INTERVAL:
+                                enqueue_response(
+                                    {"type": "transcript", "text": transcript, "is_final": False}
+                                )
+                                last_interim_text = transcript
+                                last_interim_ts = now
+
+                        if transcript.strip() and current_turn is not None and not current_turn.done():
+                            # Barge-in: the user is speaking again while a
+                            # reply is still being generated; abandon the
+                            # in-flight turn so we stop spending LLM tokens
+                            # and TTS bandwidth on it.
+                            current_turn.cancel()
+                            logger.info("Cancelled in-flight LLM/TTS turn due to barge-in.")
+
+                        if is_final and llm_service_instance:
+                            logger.info("Calling LLMService with final transcript: '%s'", transcript)
+                            current_turn = asyncio.create_task(run_turn(transcript))
+            except _RETRIABLE_STREAM_ERRORS as stream_e:
+                # Timeouts (no-audio, 305 s cap) and transient channel errors
+                # end the stream, not the session — reopen on the next chunk.
+                logger.warning(
+                    "Recognition stream ended with %s; reopening on next audio.",
+                    type(stream_e).__name__,
+                )
+            finally:
+                # Retire this stream's request generator so any stale getter
+                # it left on audio_q re-enqueues rather than swallows.
+                stream_generation[0] += 1
 
-        thread_logger.info("Google streaming_recognize iterator ended.")
+            logger.info("Utterance stream ended%s.", "" if stop_event.is_set() else "; reopening")
+
+        if current_turn is not None and not current_turn.done():
+            current_turn.cancel()
+
+        logger.info("Google streaming_recognize loop ended.")
+    except asyncio.CancelledError:
+        logger.info("STT task cancelled.")
+        raise
     except Exception as e:
-        thread_logger.exception("STT worker error: %s", e)
-        with contextlib.suppress(Exception):
-            loop.call_soon_threadsafe(
-                resp_async_q.put_nowait, {"type": "info", "message": f"STT worker critical error: {e}"}
-            )
+        logger.exception("STT task error: %s", e)
+        try:
+            enqueue_response({"type": "info", "message": f"STT worker critical error: {e}"})
+        except Exception:
+            logger.warning("Could not report STT error to client.")
     finally:
         stop_event.set()
-        thread_logger.info("STT worker exiting.")
\ No newline at end of file
+        logger.info("STT task exiting.")
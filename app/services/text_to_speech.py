@@ -2,6 +2,7 @@
 import os
 import logging
 from typing import Iterator, Optional
+import httpx
 from elevenlabs.client import ElevenLabs
 
 logger = logging.getLogger(__name__)
@@ -17,28 +18,50 @@ class TTSService:
             raise ValueError("ElevenLabs API key is required to initialize TTSService.")
         
         try:
-            self.client = ElevenLabs(api_key=api_key)
+            # Reuse warm TLS connections to api.elevenlabs.io across
+            # utterances; a fresh handshake per stream costs 50-200 ms of
+            # time-to-first-audio.
+            self.client = ElevenLabs(
+                api_key=api_key,
+                httpx_client=httpx.Client(
+                    limits=httpx.Limits(max_keepalive_connections=32, keepalive_expiry=60.0),
+                ),
+            )
             logger.info("TTSService initialized successfully.")
         except Exception as e:
-            logger.error(f"Failed to initialize ElevenLabs client: {e}", exc_info=True)
+            logger.error("Failed to initialize ElevenLabs client: %s", e, exc_info=True)
             self.client = None
             raise RuntimeError(f"Could not initialize ElevenLabs client: {e}")
 
-    def stream_audio(self, text: str, voice_id: str = "JBFqnCBsd6RMkjVDRZzb") -> Iterator[bytes]:
+    def stream_audio(
+        self,
+        text: str,
+        voice_id: str = "JBFqnCBsd6RMkjVDRZzb",
+        output_format: str = "mp3_44100_128",
+    ) -> Iterator[bytes]:
+        """
+        Streams synthesized audio for the given text.
+
+        output_format defaults to MP3, which the browser client decodes via
+        decodeAudioData. Pass "opus_48000_32" for Opus-capable consumers
+        (roughly half the bytes on the wire) or "pcm_16000" for telephony
+        pipelines that want raw PCM with no decode step.
+        """
         if self.client is None:
             logger.warning("ElevenLabs client not initialized. Cannot stream audio.")
             return iter([])
-        
+
         try:
             audio_stream = self.client.text_to_speech.stream(
                 text=text,
                 voice_id=voice_id,
                 model_id="eleven_multilingual_v2",
+                output_format=output_format,
             )
             
             for chunk in audio_stream:
                 if chunk:
                     yield chunk
         except Exception as e:
-            logger.error(f"Error streaming audio from ElevenLabs: {e}", exc_info=True)
+            logger.error("Error streaming audio from ElevenLabs: %s", e, exc_info=True)
             return iter([])
\ No newline at end of file
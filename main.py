@@ -11,42 +11,52 @@
 #   export VOICE_ASSISTANT_ELEVENLABS_API_KEY=YOUR_ELEVENLABS_API_KEY
 #
 # This app exposes:
-#   - GET  /    -> minimal HTML/JS client to stream mic audio over WebSocket and show live transcripts
+#   - GET  /    -> browser client (app/static) streaming mic audio over WebSocket, with live transcripts and TTS playback
 #   - WS  /ws   -> receives 16 kHz, mono, 16-bit PCM (LINEAR16) audio bytes and streams to Google STT
 #
 # Notes:
-#   - We bridge FastAPI's asyncio world with Google Cloud's blocking streaming_recognize by
-#     pushing audio into a thread-safe queue and running the recognizer in a background thread.
-#   - It auto-detects which google-cloud-speech streaming API signature your environment uses:
-#       * Old style: client.streaming_recognize(config=StreamingRecognitionConfig, requests=audio_gen)
-#       * New style: client.streaming_recognize(requests=req_gen_with_first_config_request)
-#   - Logging is verbose to aid debugging of chunk sizes, API status, and raw responses.
+#   - The pipeline is asyncio end-to-end: audio flows through asyncio.Queues
+#     into a shared speech.SpeechAsyncClient stream (reopened per utterance),
+#     final transcripts drive Gemini, and streamed sentences are synthesized
+#     by ElevenLabs and sent back as binary WebSocket frames. The only
+#     blocking pieces (Gemini SDK calls, the ElevenLabs audio iterator) run
+#     in the default executor.
+#   - Logging defaults to INFO; set DEBUG to see per-chunk and per-partial detail.
 
 import asyncio
-import contextlib
-import json
 import logging
 import os
-import threading
-from queue import Queue
+import sys
 from typing import Optional
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI
+
+# On Linux, prefer uvloop's libuv-based event loop for the WebSocket-heavy
+# transport: it batches I/O far more efficiently than the default selector
+# loop. Purely optional; the app runs unchanged without it.
+if sys.platform == "linux":
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        uvloop = None
+
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.staticfiles import StaticFiles
 
 # Import modules from our refactored structure
-from app.api import web_client_routes
 from app.api import websocket_routes
 from app.services import speech_to_text
 from app.services.llm_service import LLMService # Import LLMService
 from app.services.text_to_speech import TTSService # NEW: Import TTSService
-import google.generativeai as genai
 
 # ------------------------------------------------------------------------------
 # Logging setup
 # ------------------------------------------------------------------------------
+# INFO by default: DEBUG emits per-chunk and per-partial records whose
+# formatting (and the handler lock) measurably tax the streaming hot path.
 logging.basicConfig(
-    level=logging.DEBUG,
+    level=logging.INFO,
     format="%(asctime)s | %(levelname)s | %(threadName)s | %(name)s | %(message)s",
 )
 logger = logging.getLogger("voice-assistant-main")
@@ -56,9 +66,17 @@ logger = logging.getLogger("voice-assistant-main")
 # ------------------------------------------------------------------------------
 app = FastAPI(title="Real-time Voice Assistant (FastAPI + Google STT + Gemini + ElevenLabs)")
 
-app.include_router(web_client_routes.router)
+# Compress the HTML/JS client (and any future text responses) on the wire;
+# WebSocket traffic is unaffected.
+app.add_middleware(GZipMiddleware, minimum_size=500)
+
 app.include_router(websocket_routes.router)
 
+# Serve the browser client from disk: FileResponse delivery shares the OS page
+# cache across workers and handles Last-Modified/304 revalidation for free,
+# instead of holding the page as a Python string in every worker's heap.
+app.mount("/", StaticFiles(directory="app/static", html=True), name="static")
+
 # ------------------------------------------------------------------------------
 # Global Service Instances (initialized on startup)
 # ------------------------------------------------------------------------------
@@ -94,6 +112,9 @@ async def on_startup():
         logger.warning("VOICE_ASSISTANT_ELEVENLABS_API_KEY is not set. TTSService will not be initialized.")
         tts_service_instance = None
 
+    if tts_service_instance is None:
+        websocket_routes.register_startup_error("TTSService not initialized. ElevenLabs TTS will not work.")
+
     # Now, initialize LLMService and pass the TTS service to it
     gemini_api_key = os.environ.get("VOICE_ASSISTANT_GEMINI_API_KEY")
     if gemini_api_key:
@@ -110,8 +131,50 @@ async def on_startup():
         logger.warning("VOICE_ASSISTANT_GEMINI_API_KEY is not set. LLMService will not be initialized.")
         llm_service_instance = None
 
+    if llm_service_instance is None:
+        websocket_routes.register_startup_error("LLMService not initialized. Gemini LLM will not work.")
+
+    # Warm both services in the background so the first real interaction skips
+    # the TLS/auth/first-token cold start, without delaying server readiness.
+    async def _warmup():
+        if cred:
+            try:
+                client = speech_to_text._get_shared_client()
+                await client.transport.grpc_channel.channel_ready()
+                logger.info("Speech gRPC channel ready.")
+            except Exception as e:
+                logger.warning("Speech channel warmup failed: %s", e)
+        if llm_service_instance:
+            try:
+                await llm_service_instance.generate_response("ping")
+                logger.info("LLM warmup complete.")
+            except Exception as e:
+                logger.warning("LLM warmup failed: %s", e)
+        if tts_service_instance:
+            try:
+                await asyncio.to_thread(next, tts_service_instance.stream_audio("hi"), None)
+                logger.info("TTS warmup complete.")
+            except Exception as e:
+                logger.warning("TTS warmup failed: %s", e)
+
+    if cred or llm_service_instance or tts_service_instance:
+        asyncio.create_task(_warmup())
+
     logger.info("App started. Open http://127.0.0.1:8000 in your browser.")
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+
+    # Each WS session is CPU-heavy (JSON, gRPC, audio shuffling), so one
+    # worker saturates a core under a handful of concurrent listeners. Scale
+    # across cores via WEB_CONCURRENCY; "auto" picks uvloop/httptools when
+    # installed. Note service instances (LLM cache, warm TTS client) are
+    # per-process.
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        workers=int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1)),
+        loop="auto",
+        http="auto",
+    )
\ No newline at end of file
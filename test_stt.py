@@ -15,31 +15,47 @@ LANGUAGE_CODE = "en-US"
 # You can record one using Audacity or find a sample online.
 AUDIO_FILE_PATH = r"C:\repos\AI-Voice-Automation\untitled.wav" 
 
+# 100 ms of 16 kHz mono 16-bit PCM per streaming request, per Google's
+# recommended chunking.
+CHUNK_BYTES = 3200
+
 def transcribe_file(audio_file_path: str) -> str:
     """Transcribes a local audio file using Google Cloud Speech-to-Text."""
     try:
         # Instantiates a client
         client = speech.SpeechClient()
 
-        # Loads the audio file into memory
-        with io.open(audio_file_path, "rb") as audio_file:
-            content = audio_file.read()
-        audio = speech.RecognitionAudio(content=content)
-
         config = speech.RecognitionConfig(
             encoding=AUDIO_ENCODING,
             sample_rate_hertz=SAMPLE_RATE_HERTZ,
             language_code=LANGUAGE_CODE,
         )
+        streaming_config = speech.StreamingRecognitionConfig(config=config)
+
+        # Stream the file in 100 ms chunks instead of reading it fully into
+        # memory: recognition starts while the tail is still on disk, and
+        # memory stays O(chunk) instead of O(file). The sync SpeechClient's
+        # streaming_recognize helper takes the config separately and wraps
+        # the audio-only requests itself.
+        def request_gen():
+            with io.open(audio_file_path, "rb") as audio_file:
+                while chunk := audio_file.read(CHUNK_BYTES):
+                    yield speech.StreamingRecognizeRequest(audio_content=chunk)
 
-        print(f"Sending audio file '{audio_file_path}' for transcription...")
-        # Performs synchronous speech recognition
-        response = client.recognize(config=config, audio=audio)
+        print(f"Streaming audio file '{audio_file_path}' for transcription...")
+        responses = client.streaming_recognize(config=streaming_config, requests=request_gen())
 
-        transcript = ""
-        for result in response.results:
-            # The first alternative is the most likely transcription
-            transcript += result.alternatives[0].transcript + " "
+        # Collect segments in a list and join once: += on a str reallocates
+        # the whole accumulated transcript per segment.
+        parts = []
+        for response in responses:
+            for result in response.results:
+                if not result.is_final or not result.alternatives:
+                    continue
+                # The first alternative is the most likely transcription
+                print(f"Final segment: {result.alternatives[0].transcript}")
+                parts.append(result.alternatives[0].transcript)
+        transcript = " ".join(parts)
 
         if transcript:
             print(f"Transcription successful: {transcript.strip()}")